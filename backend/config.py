@@ -1,6 +1,7 @@
 """Configuration for the LLM Council."""
 
 import os
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -52,14 +53,55 @@ PERSONAS = {
     }
 }
 
+# Stamp each persona with its id once and freeze it, so fallbacks can hand out
+# the shared entries directly instead of copying them per request
+PERSONAS = {pid: MappingProxyType({**p, "id": pid}) for pid, p in PERSONAS.items()}
+
 # Default active personas for a new conversation
 DEFAULT_PERSONAS = ["skeptic", "visionary", "pragmatist"]
 
 # Chairman model - synthesizes final response
 CHAIRMAN_MODEL = "google/gemini-3-pro-preview"
 
-# OpenRouter API endpoint
+# Speculatively prefill the chairman's prompt cache with Stage 1 while Stage 2 runs
+# (only takes effect for models in PROMPT_CACHE_MODEL_PREFIXES)
+CHAIRMAN_PREFILL_ENABLED = True
+
+# Providers whose prompt caching is enabled with explicit cache_control breakpoints
+PROMPT_CACHE_MODEL_PREFIXES = ("anthropic/", "google/")
+
+# OpenRouter API endpoints
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_EMBEDDINGS_URL = "https://openrouter.ai/api/v1/embeddings"
+
+# Shared HTTP connection pool (stage1 + stage2 fan-out exceeds httpx's default of 100)
+HTTP_MAX_CONNECTIONS = 200
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 100
+
+# Per-provider request rate limits (requests/second), keyed by model prefix
+PROVIDER_RATE_LIMITS = {
+    "anthropic": 50,
+    "openai": 50,
+    "google": 50,
+    "x-ai": 20,
+}
+DEFAULT_PROVIDER_RATE_LIMIT = 20
+PROVIDER_MAX_CONCURRENCY = 32
+
+# Retries for 429 / 5xx responses (exponential backoff with jitter)
+LLM_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
 
 # Data directory for conversation storage
 DATA_DIR = "data/conversations"
+
+# Exact-match LLM response cache (deterministic calls only)
+LLM_CACHE_MAX_ENTRIES = 1024
+LLM_CACHE_TTL_SECONDS = 86400
+
+# Semantic cache for planning-stage calls (personas, titles)
+EMBEDDING_MODEL = "openai/text-embedding-3-small"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_DIR = "data/semantic_cache"
+SEMANTIC_CACHE_MAX_ENTRIES = 10000  # per namespace; the oldest quarter is dropped when full
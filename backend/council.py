@@ -1,18 +1,111 @@
 """3-stage LLM Council orchestration."""
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, AsyncIterator, Optional, Set, Tuple
 import asyncio
 import json
-from .openrouter import query_model
-from .config import PERSONAS, DEFAULT_PERSONAS, CHAIRMAN_MODEL
+import re
+from functools import lru_cache
+from .openrouter import query_model, query_model_stream, encode_messages, Messages
+from .llm_cache import cached_query_model
+from .semantic_cache import persona_cache, title_cache, embed_query, context_hash
+from .config import (
+    PERSONAS,
+    DEFAULT_PERSONAS,
+    CHAIRMAN_MODEL,
+    CHAIRMAN_PREFILL_ENABLED,
+    PROMPT_CACHE_MODEL_PREFIXES,
+)
+
+# Stage 1 views shared by stages 2 and 3: (label_to_persona, anonymized text, attributed text)
+Stage1Blocks = Tuple[Dict[str, str], str, str]
+
+# Ranking parsers: number, period, optional space, "Response X"; or any bare "Response X"
+_NUMBERED_RANKING_RE = re.compile(r'\d+\.\s*(Response [A-Z])')
+_RESPONSE_LABEL_RE = re.compile(r'Response [A-Z]')
+
+# Fire-and-forget tasks (chairman prefill); the event loop only keeps weak
+# references, so hold them here until they finish
+_background_tasks: Set["asyncio.Task"] = set()
+
+# Static prompt text, built once at import so every request shares
+# byte-identical prefixes (keeps exact-match and provider prompt caches hitting)
+_RANKING_HEADER = "You are evaluating different responses to the following question:\n\nQuestion: "
+_RANKING_RESPONSES_HEADER = "\n\nHere are the responses from different perspectives (anonymized):\n\n"
+_RANKING_INSTRUCTIONS = """
 
+Your task:
+1. First, evaluate each response individually. For each response, explain what it does well and what it does poorly.
+2. Then, at the very end of your response, provide a final ranking.
+
+IMPORTANT: Your final ranking MUST be formatted EXACTLY as follows:
+- Start with the line "FINAL RANKING:" (all caps, with colon)
+- Then list the responses from best to worst as a numbered list
+- Each line should be: number, period, space, then ONLY the response label (e.g., "1. Response A")
+- Do not add any other text or explanations in the ranking section
+
+Example of the correct format for your ENTIRE response:
+
+Response A provides good detail on X but misses Y...
+Response B is accurate but lacks depth on Z...
+Response C offers the most comprehensive answer...
+
+FINAL RANKING:
+1. Response C
+2. Response A
+3. Response B
+
+Now provide your evaluation and ranking:"""
+
+_CHAIRMAN_HEADER = (
+    "You are the Chairman of an LLM Council. Multiple AI Experts (Personas) have provided "
+    "responses to a user's question, and then ranked each other's responses.\n\n"
+    "Original Question: "
+)
+_CHAIRMAN_STAGE1_HEADER = "\n\nSTAGE 1 - Expert Responses:\n"
+_CHAIRMAN_STAGE2_HEADER = "STAGE 2 - Peer Rankings:\n"
+_CHAIRMAN_INSTRUCTIONS = """
+
+Your task as Chairman is to synthesize all of this information into a single, comprehensive, accurate answer to the user's original question. Consider:
+- The individual responses and their unique perspectives
+- The peer rankings and what they reveal about response quality
+- Any patterns of agreement or disagreement
+
+Provide a clear, well-reasoned final answer that represents the council's collective wisdom:"""
+
+
+def _parse_personas(content: str) -> List[Dict[str, Any]]:
+    """Extract the personas list from the chairman's JSON reply (raises if it isn't valid JSON)."""
+    # Clean up markdown code blocks if present
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+
+    data = json.loads(content.strip())
+    return data.get("personas", [])
+
+
+def _has_personas(content: str) -> bool:
+    """Whether a persona-planning reply is worth caching."""
+    try:
+        return bool(_parse_personas(content))
+    except Exception:
+        return False
 
-async def generate_dynamic_personas(user_query: str) -> List[Dict[str, str]]:
+
+async def generate_dynamic_personas(
+    user_query: str,
+    context: Optional[List[str]] = None
+) -> List[Dict[str, str]]:
     """
     Generate a list of relevant personas based on the user query.
+
+    Paraphrases of an earlier query with the same conversation context are
+    served from the semantic cache without calling the chairman model.
     
     Args:
         user_query: The user's question
+        context: Prior user messages in the conversation, if any
         
     Returns:
         List of dicts with 'id', 'name', 'role', 'icon', 'style', 'system_prompt', 'model'
@@ -37,160 +130,249 @@ async def generate_dynamic_personas(user_query: str) -> List[Dict[str, str]]:
     - "model": The LLM model to use (choose from: "openai/gpt-5.1", "anthropic/claude-sonnet-4.5", "google/gemini-3-pro-preview", "x-ai/grok-4"). Assign the most appropriate model for the role.
     
     JSON Response:"""
+
+    ctx_hash = context_hash(context)
+    embedding = await embed_query(user_query)
+    if embedding is not None:
+        cached = await persona_cache.find(embedding, ctx_hash)
+        if cached is not None:
+            return cached
     
     messages = [{"role": "user", "content": prompt}]
     
     # Use a smart model for this planning step
-    response = await query_model(CHAIRMAN_MODEL, messages)
+    # (only replies that parse into personas are cached, so a malformed one is retried next time)
+    response = await cached_query_model(CHAIRMAN_MODEL, messages, validate=_has_personas)
     
     if not response or not response.get('content'):
         # Fallback to default personas if generation fails
-        return [
-            {**PERSONAS[pid], "id": pid} for pid in DEFAULT_PERSONAS if pid in PERSONAS
-        ]
+        return [PERSONAS[pid] for pid in DEFAULT_PERSONAS if pid in PERSONAS]
         
     try:
-        content = response['content']
-        # Clean up markdown code blocks if present
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-            
-        data = json.loads(content.strip())
-        return data.get("personas", [])
+        personas = _parse_personas(response['content'])
     except Exception as e:
         print(f"Error parsing dynamic personas: {e}")
         # Fallback
-        return [
-            {**PERSONAS[pid], "id": pid} for pid in DEFAULT_PERSONAS if pid in PERSONAS
-        ]
+        return [PERSONAS[pid] for pid in DEFAULT_PERSONAS if pid in PERSONAS]
 
+    if personas and embedding is not None:
+        await persona_cache.store(embedding, user_query, ctx_hash, personas)
+    return personas
 
-async def stage1_collect_responses(user_query: str, personas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+async def stage1_iter_responses(
+    user_query: str,
+    personas: List[Dict[str, Any]]
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
     """
-    Stage 1: Collect individual responses from selected personas.
+    Stage 1: Yield individual persona responses as soon as each one completes.
 
     Args:
         user_query: The user's question
         personas: List of persona objects to consult
 
-    Returns:
-        List of dicts with 'persona_id', 'model', 'response', etc.
+    Yields:
+        Tuples of (persona index, result dict) in completion order.
+        Failed personas are skipped.
     """
-    # Create tasks for each persona
-    tasks = []
-    
-    for persona in personas:
+    async def ask(index: int, persona: Dict[str, Any]):
         messages = [
             {"role": "system", "content": persona["system_prompt"]},
             {"role": "user", "content": user_query}
         ]
-        
-        tasks.append(query_model(persona["model"], messages))
-
-    # Query all models in parallel
-    responses = await asyncio.gather(*tasks)
+        return index, persona, await query_model(persona["model"], messages)
 
-    # Format results
-    stage1_results = []
-    for persona, response in zip(personas, responses):
-        if response is not None:  # Only include successful responses
-            stage1_results.append({
-                "persona_id": persona["id"],
-                "persona_name": persona["name"],
-                "persona_role": persona["role"],
-                "persona_icon": persona["icon"],
-                "model": persona["model"],
-                "response": response.get('content', '')
-            })
+    # Query all models in parallel, handing back whichever finishes first
+    tasks = [asyncio.create_task(ask(i, persona)) for i, persona in enumerate(personas)]
 
-    return stage1_results
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, persona, response = await next_done
+            if response is not None:  # Only include successful responses
+                yield index, _stage1_result(persona, response.get('content', ''))
+    finally:
+        # Don't leak in-flight requests if the consumer stops early
+        for task in tasks:
+            task.cancel()
 
 
-async def stage2_collect_rankings(
+async def stage1_stream_responses(
     user_query: str,
-    stage1_results: List[Dict[str, Any]]
-) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    personas: List[Dict[str, Any]]
+) -> AsyncIterator[Tuple[str, int, Any]]:
     """
-    Stage 2: Each model ranks the anonymized responses.
+    Stage 1, streaming: yield token deltas from all personas as they are generated.
 
     Args:
-        user_query: The original user query
-        stage1_results: Results from Stage 1
+        user_query: The user's question
+        personas: List of persona objects to consult
 
-    Returns:
-        Tuple of (rankings list, label_to_persona mapping)
+    Yields:
+        ("token", persona index, delta) while a persona is writing, then
+        ("response", persona index, result dict) once its answer is complete.
+        Failed personas are skipped.
     """
-    # Create anonymized labels for responses (Response A, Response B, etc.)
-    labels = [chr(65 + i) for i in range(len(stage1_results))]  # A, B, C, ...
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def ask(index: int, persona: Dict[str, Any]):
+        messages = [
+            {"role": "system", "content": persona["system_prompt"]},
+            {"role": "user", "content": user_query}
+        ]
+        chunks = []
+        try:
+            async for delta in query_model_stream(persona["model"], messages):
+                chunks.append(delta)
+                queue.put_nowait(("token", index, delta))
+            queue.put_nowait(("response", index, _stage1_result(persona, "".join(chunks))))
+        except Exception as e:
+            print(f"Error streaming model {persona['model']}: {e}")
+        finally:
+            queue.put_nowait(None)  # This persona is done
+
+    # Stream all models in parallel, multiplexed through one queue
+    tasks = [asyncio.create_task(ask(i, persona)) for i, persona in enumerate(personas)]
 
-    # Create mapping from label to persona name (for display)
-    label_to_persona = {
-        f"Response {label}": result['persona_name']
-        for label, result in zip(labels, stage1_results)
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await queue.get()
+            if event is None:
+                remaining -= 1
+            else:
+                yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _stage1_result(persona: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """Format a persona's answer as a Stage 1 result."""
+    return {
+        "persona_id": persona["id"],
+        "persona_name": persona["name"],
+        "persona_role": persona["role"],
+        "persona_icon": persona["icon"],
+        "model": persona["model"],
+        "response": content
     }
 
-    # Build the ranking prompt
-    responses_text = "\n\n".join([
-        f"Response {label}:\n{result['response']}"
-        for label, result in zip(labels, stage1_results)
-    ])
 
-    ranking_prompt = f"""You are evaluating different responses to the following question:
+async def stage1_collect_responses(user_query: str, personas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Stage 1: Collect individual responses from selected personas.
 
-Question: {user_query}
+    Args:
+        user_query: The user's question
+        personas: List of persona objects to consult
 
-Here are the responses from different perspectives (anonymized):
+    Returns:
+        List of dicts with 'persona_id', 'model', 'response', etc., in persona order
+    """
+    indexed_results = [item async for item in stage1_iter_responses(user_query, personas)]
+    indexed_results.sort(key=lambda item: item[0])
 
-{responses_text}
+    return [result for _, result in indexed_results]
 
-Your task:
-1. First, evaluate each response individually. For each response, explain what it does well and what it does poorly.
-2. Then, at the very end of your response, provide a final ranking.
 
-IMPORTANT: Your final ranking MUST be formatted EXACTLY as follows:
-- Start with the line "FINAL RANKING:" (all caps, with colon)
-- Then list the responses from best to worst as a numbered list
-- Each line should be: number, period, space, then ONLY the response label (e.g., "1. Response A")
-- Do not add any other text or explanations in the ranking section
+def format_stage1_blocks(stage1_results: List[Dict[str, Any]]) -> Stage1Blocks:
+    """
+    Build every Stage 1 view later stages need, in one pass over the responses.
 
-Example of the correct format for your ENTIRE response:
+    Computed once per turn and passed to stage2_collect_rankings,
+    start_chairman_prefill and stage3_synthesize_final, so the (possibly
+    very long) persona texts are only walked once and the anonymization
+    mapping is guaranteed identical everywhere.
 
-Response A provides good detail on X but misses Y...
-Response B is accurate but lacks depth on Z...
-Response C offers the most comprehensive answer...
+    Args:
+        stage1_results: Results from Stage 1
 
-FINAL RANKING:
-1. Response C
-2. Response A
-3. Response B
+    Returns:
+        Tuple of (label_to_persona mapping, anonymized text for rankers,
+        attributed text for the chairman)
+    """
+    label_to_persona = {}
+    anonymized = []
+    attributed = []
 
-Now provide your evaluation and ranking:"""
+    for i, result in enumerate(stage1_results):
+        # Anonymized labels: Response A, Response B, ...
+        label = f"Response {chr(65 + i)}"
+        label_to_persona[label] = result['persona_name']
+        anonymized.append(f"{label}:\n{result['response']}")
+        attributed.append(
+            f"Persona: {result['persona_name']} ({result['persona_icon']})\nResponse: {result['response']}"
+        )
+
+    return label_to_persona, "\n\n".join(anonymized), "\n\n".join(attributed)
+
+
+async def stage2_collect_rankings(
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
+    blocks: Optional[Stage1Blocks] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Stage 2: Each model ranks the anonymized responses.
+
+    Args:
+        user_query: The original user query
+        stage1_results: Results from Stage 1
+        blocks: Output of format_stage1_blocks, if already computed
+
+    Returns:
+        Tuple of (rankings list, label_to_persona mapping)
+    """
+    label_to_persona, responses_text, _ = blocks or format_stage1_blocks(stage1_results)
 
-    messages = [{"role": "user", "content": ranking_prompt}]
+    # Build the ranking prompt
+    ranking_prompt = "".join([
+        _RANKING_HEADER,
+        user_query,
+        _RANKING_RESPONSES_HEADER,
+        responses_text,
+        _RANKING_INSTRUCTIONS
+    ])
 
     # Get rankings from all participating models in parallel
     # We use the same models that generated the responses to also rank them
     # This ensures the "Council" is ranking itself
-    tasks = []
-    ranking_models = []
-    
-    for result in stage1_results:
-        model = result['model']
-        ranking_models.append(result['persona_name']) # Track who is ranking
-        tasks.append(query_model(model, messages))
+    # Rankings are deterministic (temperature 0), so personas sharing a model
+    # would get identical text: send one request per model and share it
+    model_rankers: Dict[str, List[int]] = {}
+    for i, result in enumerate(stage1_results):
+        model_rankers.setdefault(result['model'], []).append(i)
+
+    # The multi-KB prompt has at most two wire forms (with/without cache_control);
+    # serialize each once and share the bytes across every ranker request
+    encoded_messages: Dict[bool, Messages] = {}
+
+    def ranking_messages(model: str) -> Messages:
+        uses_cache_control = model.startswith(PROMPT_CACHE_MODEL_PREFIXES)
+        if uses_cache_control not in encoded_messages:
+            encoded_messages[uses_cache_control] = encode_messages(
+                cacheable_user_messages(model, ranking_prompt)
+            )
+        return encoded_messages[uses_cache_control]
+
+    responses = await asyncio.gather(*[
+        cached_query_model(model, ranking_messages(model))
+        for model in model_rankers
+    ])
 
-    responses = await asyncio.gather(*tasks)
+    rankings: List[Optional[str]] = [None] * len(stage1_results)
+    for indices, response in zip(model_rankers.values(), responses):
+        if response is not None:
+            for i in indices:
+                rankings[i] = response.get('content') or ''
 
     # Format results
     stage2_results = []
-    for ranker_name, response in zip(ranking_models, responses):
-        if response is not None:
-            full_text = response.get('content', '')
+    for result, full_text in zip(stage1_results, rankings):
+        if full_text is not None:
             parsed = parse_ranking_from_text(full_text)
             stage2_results.append({
-                "model": ranker_name, # Using persona name as the "model" identifier for display
+                "model": result['persona_name'], # Using persona name as the "model" identifier for display
                 "ranking": full_text,
                 "parsed_ranking": parsed
             })
@@ -198,10 +380,94 @@ Now provide your evaluation and ranking:"""
     return stage2_results, label_to_persona
 
 
+def cacheable_user_messages(model: str, prompt: str, suffix: str = "") -> List[Dict[str, Any]]:
+    """
+    Build a single user message, marking it for provider prompt caching where supported.
+
+    Anthropic and Gemini only cache prefixes that end at an explicit
+    cache_control breakpoint; other providers cache automatically and get
+    the plain string form.
+
+    Args:
+        model: OpenRouter model identifier
+        prompt: The cacheable prompt text
+        suffix: Optional text sent after the cache breakpoint
+
+    Returns:
+        Messages list to send to the model
+    """
+    if model.startswith(PROMPT_CACHE_MODEL_PREFIXES):
+        content = [
+            {"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}
+        ]
+        if suffix:
+            content.append({"type": "text", "text": suffix})
+        return [{"role": "user", "content": content}]
+    return [{"role": "user", "content": prompt + suffix}]
+
+
+def build_chairman_context(
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
+    blocks: Optional[Stage1Blocks] = None
+) -> str:
+    """
+    Build the chairman prompt up to and including the Stage 1 responses.
+
+    This part is fully known once Stage 1 finishes, so it is the prefix
+    shared by the speculative prefill and the real Stage 3 call.
+
+    Args:
+        user_query: The original user query
+        stage1_results: Individual model responses from Stage 1
+        blocks: Output of format_stage1_blocks, if already computed
+
+    Returns:
+        Prompt prefix text
+    """
+    _, _, stage1_text = blocks or format_stage1_blocks(stage1_results)
+
+    return "".join([_CHAIRMAN_HEADER, user_query, _CHAIRMAN_STAGE1_HEADER, stage1_text, "\n\n"])
+
+
+def start_chairman_prefill(
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
+    blocks: Optional[Stage1Blocks] = None
+) -> Optional["asyncio.Task"]:
+    """
+    Speculatively warm the chairman's provider-side prompt cache while Stage 2 runs.
+
+    Sends only the Stage 1 prefix (marked cache_control) with max_tokens=1,
+    so the real Stage 3 call finds its largest block already prefilled.
+    The task is left to finish on its own, even after the request that
+    started it returns: aborting the request early can drop the
+    provider's cache write.
+
+    Args:
+        user_query: The original user query
+        stage1_results: Individual model responses from Stage 1
+        blocks: Output of format_stage1_blocks, if already computed
+
+    Returns:
+        The background task, or None if prefill is disabled or the
+        chairman's provider has no explicit prompt caching
+    """
+    if not CHAIRMAN_PREFILL_ENABLED or not CHAIRMAN_MODEL.startswith(PROMPT_CACHE_MODEL_PREFIXES):
+        return None
+
+    messages = cacheable_user_messages(CHAIRMAN_MODEL, build_chairman_context(user_query, stage1_results, blocks))
+    task = asyncio.create_task(query_model(CHAIRMAN_MODEL, messages, max_tokens=1))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
 async def stage3_synthesize_final(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
-    stage2_results: List[Dict[str, Any]]
+    stage2_results: List[Dict[str, Any]],
+    blocks: Optional[Stage1Blocks] = None
 ) -> Dict[str, Any]:
     """
     Stage 3: Chairman synthesizes final response.
@@ -210,42 +476,26 @@ async def stage3_synthesize_final(
         user_query: The original user query
         stage1_results: Individual model responses from Stage 1
         stage2_results: Rankings from Stage 2
+        blocks: Output of format_stage1_blocks, if already computed
 
     Returns:
         Dict with 'model' and 'response' keys
     """
     # Build comprehensive context for chairman
-    stage1_text = "\n\n".join([
-        f"Persona: {result['persona_name']} ({result['persona_icon']})\nResponse: {result['response']}"
-        for result in stage1_results
-    ])
+    chairman_context = build_chairman_context(user_query, stage1_results, blocks)
 
     stage2_text = "\n\n".join([
         f"Ranker: {result['model']}\nRanking: {result['ranking']}"
         for result in stage2_results
     ])
 
-    chairman_prompt = f"""You are the Chairman of an LLM Council. Multiple AI Experts (Personas) have provided responses to a user's question, and then ranked each other's responses.
-
-Original Question: {user_query}
-
-STAGE 1 - Expert Responses:
-{stage1_text}
-
-STAGE 2 - Peer Rankings:
-{stage2_text}
-
-Your task as Chairman is to synthesize all of this information into a single, comprehensive, accurate answer to the user's original question. Consider:
-- The individual responses and their unique perspectives
-- The peer rankings and what they reveal about response quality
-- Any patterns of agreement or disagreement
-
-Provide a clear, well-reasoned final answer that represents the council's collective wisdom:"""
+    chairman_task = "".join([_CHAIRMAN_STAGE2_HEADER, stage2_text, _CHAIRMAN_INSTRUCTIONS])
 
-    messages = [{"role": "user", "content": chairman_prompt}]
+    # The Stage 1 context is the cacheable prefix (see start_chairman_prefill)
+    messages = cacheable_user_messages(CHAIRMAN_MODEL, chairman_context, chairman_task)
 
     # Query the chairman model
-    response = await query_model(CHAIRMAN_MODEL, messages)
+    response = await cached_query_model(CHAIRMAN_MODEL, messages)
 
     if response is None:
         # Fallback if chairman fails
@@ -270,28 +520,30 @@ def parse_ranking_from_text(ranking_text: str) -> List[str]:
     Returns:
         List of response labels in ranked order
     """
-    import re
+    return list(_parse_ranking_labels(ranking_text))
+
 
+@lru_cache(maxsize=256)
+def _parse_ranking_labels(ranking_text: str) -> Tuple[str, ...]:
+    """Memoized parser behind parse_ranking_from_text (stage2 and aggregation parse the same texts)."""
     # Look for "FINAL RANKING:" section
     if "FINAL RANKING:" in ranking_text:
         # Extract everything after "FINAL RANKING:"
         parts = ranking_text.split("FINAL RANKING:")
         if len(parts) >= 2:
             ranking_section = parts[1]
-            # Try to extract numbered list format (e.g., "1. Response A")
-            # This pattern looks for: number, period, optional space, "Response X"
-            numbered_matches = re.findall(r'\d+\.\s*Response [A-Z]', ranking_section)
-            if numbered_matches:
-                # Extract just the "Response X" part
-                return [re.search(r'Response [A-Z]', m).group() for m in numbered_matches]
-
-            # Fallback: Extract all "Response X" patterns in order
-            matches = re.findall(r'Response [A-Z]', ranking_section)
-            return matches
+            # Prefer numbered list format (e.g., "1. Response A"), otherwise
+            # fall back to all "Response X" patterns in order
+            return tuple(_NUMBERED_RANKING_RE.findall(ranking_section) or _RESPONSE_LABEL_RE.findall(ranking_section))
 
     # Fallback: try to find any "Response X" patterns in order
-    matches = re.findall(r'Response [A-Z]', ranking_text)
-    return matches
+    return tuple(_RESPONSE_LABEL_RE.findall(ranking_text))
+
+
+@lru_cache(maxsize=256)
+def _parse_ranking_indices(ranking_text: str) -> Tuple[int, ...]:
+    """Ranked labels as integer indices ("Response A" -> 0, "Response B" -> 1, ...)."""
+    return tuple(ord(label[-1]) - 65 for label in _parse_ranking_labels(ranking_text))
 
 
 def calculate_aggregate_rankings(
@@ -308,32 +560,46 @@ def calculate_aggregate_rankings(
     Returns:
         List of dicts with model name and average rank, sorted best to worst
     """
-    from collections import defaultdict
-
-    # Track positions for each model
-    model_positions = defaultdict(list)
+    # Persona per label index (Response A = 0, B = 1, ...); parsed rankings only
+    # ever contain A-Z, so labels past Z (27+ responses) can never be voted for
+    personas_by_index: List[Optional[str]] = [None] * 26
+    for label, persona_name in label_to_persona.items():
+        label_index = ord(label[-1]) - 65
+        if 0 <= label_index < 26:
+            personas_by_index[label_index] = persona_name
+
+    # Accumulate positions per label index; labels the council never used are ignored
+    position_sums = [0] * 26
+    counts = [0] * 26
+    first_voted: List[int] = []
 
     for ranking in stage2_results:
-        ranking_text = ranking['ranking']
-
         # Parse the ranking from the structured format
-        parsed_ranking = parse_ranking_from_text(ranking_text)
-
-        for position, label in enumerate(parsed_ranking, start=1):
-            if label in label_to_persona:
-                persona_name = label_to_persona[label]
-                model_positions[persona_name].append(position)
+        for position, label_index in enumerate(_parse_ranking_indices(ranking['ranking']), start=1):
+            if personas_by_index[label_index] is None:
+                continue
+            if not counts[label_index]:
+                first_voted.append(label_index)
+            position_sums[label_index] += position
+            counts[label_index] += 1
+
+    # Fold label totals into persona totals in first-vote order, so personas
+    # with equal average ranks keep a stable order through the sort below
+    totals: Dict[str, Tuple[int, int]] = {}
+    for label_index in first_voted:
+        persona_name = personas_by_index[label_index]
+        position_sum, count = totals.get(persona_name, (0, 0))
+        totals[persona_name] = (position_sum + position_sums[label_index], count + counts[label_index])
 
     # Calculate average position for each model
-    aggregate = []
-    for model, positions in model_positions.items():
-        if positions:
-            avg_rank = sum(positions) / len(positions)
-            aggregate.append({
-                "model": model,
-                "average_rank": round(avg_rank, 2),
-                "rankings_count": len(positions)
-            })
+    aggregate = [
+        {
+            "model": model,
+            "average_rank": round(position_sum / count, 2),
+            "rankings_count": count
+        }
+        for model, (position_sum, count) in totals.items()
+    ]
 
     # Sort by average rank (lower is better)
     aggregate.sort(key=lambda x: x['average_rank'])
@@ -358,10 +624,17 @@ Question: {user_query}
 
 Title:"""
 
+    ctx_hash = context_hash()
+    embedding = await embed_query(user_query)
+    if embedding is not None:
+        cached = await title_cache.find(embedding, ctx_hash)
+        if cached is not None:
+            return cached
+
     messages = [{"role": "user", "content": title_prompt}]
 
     # Use gemini-2.5-flash for title generation (fast and cheap)
-    response = await query_model("google/gemini-2.5-flash", messages, timeout=30.0)
+    response = await cached_query_model("google/gemini-2.5-flash", messages, timeout=30.0)
 
     if response is None:
         # Fallback to a generic title
@@ -376,6 +649,9 @@ Title:"""
     if len(title) > 50:
         title = title[:47] + "..."
 
+    if embedding is not None:
+        await title_cache.store(embedding, user_query, ctx_hash, title)
+
     return title
 
 
@@ -423,18 +699,22 @@ async def generate_direct_reply(
     }
 
 
-async def run_full_council(user_query: str) -> Tuple[List, List, List, Dict, Dict]:
+async def run_full_council(
+    user_query: str,
+    context: Optional[List[str]] = None
+) -> Tuple[List, List, List, Dict, Dict]:
     """
     Run the complete 3-stage council process with dynamic personas.
 
     Args:
         user_query: The user's question
+        context: Prior user messages in the conversation, if any
 
     Returns:
         Tuple of (personas, stage1_results, stage2_results, stage3_result, metadata)
     """
     # Step 0: Generate Dynamic Personas
-    personas = await generate_dynamic_personas(user_query)
+    personas = await generate_dynamic_personas(user_query, context)
     
     # Stage 1: Collect individual responses
     stage1_results = await stage1_collect_responses(user_query, personas)
@@ -446,8 +726,12 @@ async def run_full_council(user_query: str) -> Tuple[List, List, List, Dict, Dic
             "response": "All models failed to respond. Please try again."
         }, {}
 
+    # Warm the chairman's prompt cache while Stage 2 ranks
+    blocks = format_stage1_blocks(stage1_results)
+    start_chairman_prefill(user_query, stage1_results, blocks)
+
     # Stage 2: Collect rankings
-    stage2_results, label_to_persona = await stage2_collect_rankings(user_query, stage1_results)
+    stage2_results, label_to_persona = await stage2_collect_rankings(user_query, stage1_results, blocks)
 
     # Calculate aggregate rankings
     aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_persona)
@@ -456,7 +740,8 @@ async def run_full_council(user_query: str) -> Tuple[List, List, List, Dict, Dic
     stage3_result = await stage3_synthesize_final(
         user_query,
         stage1_results,
-        stage2_results
+        stage2_results,
+        blocks
     )
 
     # Prepare metadata
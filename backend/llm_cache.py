@@ -0,0 +1,136 @@
+"""Exact-match response cache for deterministic LLM calls."""
+
+import asyncio
+import hashlib
+import time
+import orjson
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+from .openrouter import query_model, Messages
+from .config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+
+
+class LLMCache:
+    """
+    In-memory LRU cache of model responses with per-entry TTL.
+
+    The interface is async so a shared backend (e.g. Redis) can be
+    swapped in later without touching callers.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(model: str, messages: Messages, temperature: float) -> str:
+        """Build a stable SHA-256 key for a (model, messages, temperature) triple."""
+        raw = orjson.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            option=orjson.OPT_SORT_KEYS
+        )
+        return hashlib.sha256(raw).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for key, or None on miss/expiry."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """Store a response, evicting the least recently used entry if full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for observability."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Process-wide cache shared by all council stages
+llm_cache = LLMCache()
+
+# Requests currently awaiting the provider, keyed like the cache
+_inflight: Dict[str, "asyncio.Task[Optional[Dict[str, Any]]]"] = {}
+
+
+async def _query_and_store(
+    key: str,
+    model: str,
+    messages: Messages,
+    timeout: float,
+    temperature: float,
+    validate: Optional[Callable[[str], bool]]
+) -> Optional[Dict[str, Any]]:
+    response = await query_model(model, messages, timeout=timeout, temperature=temperature)
+    content = response.get('content') if response is not None else None
+    if content and (validate is None or validate(content)):
+        await llm_cache.set(key, response)
+    return response
+
+
+async def cached_query_model(
+    model: str,
+    messages: Messages,
+    timeout: float = 120.0,
+    validate: Optional[Callable[[str], bool]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Query a model deterministically (temperature 0), serving repeats from the cache.
+
+    Identical requests that arrive while one is already in flight (e.g. two
+    users sending the same first message) share its result instead of
+    racing to the provider. Only successful responses are cached (and,
+    with `validate`, only ones the caller can use), so transient failures
+    and malformed replies are retried on the next call.
+
+    Args:
+        model: OpenRouter model identifier
+        messages: List of message dicts with 'role' and 'content' (or pre-serialized)
+        timeout: Request timeout in seconds
+        validate: Optional check on the response content; content it rejects is not cached
+
+    Returns:
+        Response dict as returned by query_model, or None if failed
+    """
+    temperature = 0.0
+    key = LLMCache.make_key(model, messages, temperature)
+
+    cached = await llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(
+            _query_and_store(key, model, messages, timeout, temperature, validate)
+        )
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        llm_cache.coalesced += 1
+
+    # Shield so one caller disconnecting doesn't cancel the request for the others
+    return await asyncio.shield(task)
@@ -5,15 +5,28 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
 import uuid
-import json
 import asyncio
+import orjson
 
 from . import storage
+from .openrouter import get_client, close_client, prompt_cache_usage
 from .config import PERSONAS
-from .council import run_full_council, generate_conversation_title, stage1_collect_responses, stage2_collect_rankings, stage3_synthesize_final, calculate_aggregate_rankings, generate_direct_reply
+from .llm_cache import llm_cache
+from .semantic_cache import persona_cache, title_cache
+from .council import run_full_council, generate_conversation_title, stage1_stream_responses, stage2_collect_rankings, stage3_synthesize_final, calculate_aggregate_rankings, generate_direct_reply, start_chairman_prefill, format_stage1_blocks
 
-app = FastAPI(title="LLM Council API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared OpenRouter client on startup and close it on shutdown."""
+    get_client()
+    yield
+    await close_client()
+
+
+app = FastAPI(title="LLM Council API", lifespan=lifespan)
 
 # Enable CORS for local development
 app.add_middleware(
@@ -25,6 +38,52 @@ app.add_middleware(
 )
 
 
+def sse_event(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as one Server-Sent Events message."""
+    # default=dict: built-in personas are read-only MappingProxyType views
+    return b"data: " + orjson.dumps(payload, default=dict) + b"\n\n"
+
+
+async def persist_turn(
+    conversation: Dict[str, Any],
+    turn_start: int,
+    title_task: Optional[asyncio.Task] = None
+):
+    """
+    Save the messages a turn appended to `conversation`, even if the request is being cancelled.
+
+    Runs from `finally` blocks so the user's message (and a title that has
+    already been generated) survive client disconnects and council failures.
+    Only messages from `turn_start` on are written, on top of what is on
+    disk now, so turns running concurrently on one conversation don't
+    overwrite each other.
+    """
+    title = None
+    if title_task is not None:
+        if not title_task.done():
+            # The turn ended early (failure or disconnect); nobody will read this title
+            title_task.cancel()
+        elif not title_task.cancelled() and title_task.exception() is None:
+            title = title_task.result()
+
+    # Shield so a second cancellation can't abandon the write halfway through the await
+    await asyncio.shield(asyncio.to_thread(
+        storage.save_turn,
+        conversation["id"],
+        conversation["messages"][turn_start:],
+        title
+    ))
+
+
+async def await_title(title_task: asyncio.Task) -> str:
+    """Wait for a title generated alongside the council; a failure falls back to the default title."""
+    try:
+        return await title_task
+    except Exception as e:
+        print(f"Error generating title: {e}")
+        return "New Conversation"
+
+
 class CreateConversationRequest(BaseModel):
     """Request to create a new conversation."""
     pass
@@ -69,24 +128,37 @@ async def list_personas():
     return PERSONAS
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the LLM caches and provider-side prompt caching."""
+    return {
+        **llm_cache.stats(),
+        "semantic": {
+            "personas": persona_cache.stats(),
+            "titles": title_cache.stats()
+        },
+        "provider_prompt_cache": prompt_cache_usage
+    }
+
+
 @app.get("/api/conversations", response_model=List[ConversationMetadata])
 async def list_conversations():
     """List all conversations (metadata only)."""
-    return storage.list_conversations()
+    return await asyncio.to_thread(storage.list_conversations)
 
 
 @app.post("/api/conversations", response_model=Conversation)
 async def create_conversation(request: CreateConversationRequest):
     """Create a new conversation."""
     conversation_id = str(uuid.uuid4())
-    conversation = storage.create_conversation(conversation_id)
+    conversation = await asyncio.to_thread(storage.create_conversation, conversation_id)
     return conversation
 
 
 @app.get("/api/conversations/{conversation_id}", response_model=Conversation)
 async def get_conversation(conversation_id: str):
     """Get a specific conversation with all its messages."""
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await asyncio.to_thread(storage.get_conversation, conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
     return conversation
@@ -99,34 +171,48 @@ async def send_message(conversation_id: str, request: SendMessageRequest):
     Returns the complete response with all stages.
     """
     # Check if conversation exists
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await asyncio.to_thread(storage.get_conversation, conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # Check if this is the first message
     is_first_message = len(conversation["messages"]) == 0
 
-    # Add user message
-    storage.add_user_message(conversation_id, request.content)
-
-    # If this is the first message, generate a title
-    if is_first_message:
-        title = await generate_conversation_title(request.content)
-        storage.update_conversation_title(conversation_id, title)
+    # Prior user turns, used to verify semantic cache hits
+    context = [m["content"] for m in conversation["messages"] if m["role"] == "user"]
 
-    # Run the 3-stage council process
-    personas, stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
-        request.content
-    )
+    # Add user message (kept in memory; the whole turn is saved once below)
+    turn_start = len(conversation["messages"])
+    storage.append_user_message(conversation, request.content)
 
-    # Add assistant message with all stages
-    storage.add_assistant_message(
-        conversation_id,
-        personas,
-        stage1_results,
-        stage2_results,
-        stage3_result
-    )
+    # Start title generation in parallel (don't await yet)
+    title_task = None
+    if is_first_message:
+        title_task = asyncio.create_task(generate_conversation_title(request.content))
+
+    try:
+        # Run the 3-stage council process
+        personas, stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
+            request.content,
+            context
+        )
+
+        # Add assistant message with all stages
+        storage.append_assistant_message(
+            conversation,
+            personas,
+            stage1_results,
+            stage2_results,
+            stage3_result
+        )
+
+        # The title has usually finished long before the council; a failed
+        # one must not cost the finished council result
+        if title_task:
+            await await_title(title_task)
+    finally:
+        # Save the turn in one write; on failure this still keeps the user's message
+        await persist_turn(conversation, turn_start, title_task)
 
     # Return the complete response with metadata
     return {
@@ -145,66 +231,99 @@ async def send_message_stream(conversation_id: str, request: SendMessageRequest)
     Returns Server-Sent Events as each stage completes.
     """
     # Check if conversation exists
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await asyncio.to_thread(storage.get_conversation, conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # Check if this is the first message
     is_first_message = len(conversation["messages"]) == 0
 
+    # Prior user turns, used to verify semantic cache hits
+    context = [m["content"] for m in conversation["messages"] if m["role"] == "user"]
+
     async def event_generator():
+        title_task = None
+        saved = False
+        turn_start = len(conversation["messages"])
         try:
-            # Add user message
-            storage.add_user_message(conversation_id, request.content)
+            # Add user message (kept in memory; the whole turn is saved once at the end)
+            storage.append_user_message(conversation, request.content)
 
             # Start title generation in parallel (don't await yet)
-            title_task = None
             if is_first_message:
                 title_task = asyncio.create_task(generate_conversation_title(request.content))
 
             # Step 0: Generate Personas
-            yield f"data: {json.dumps({'type': 'personas_start'})}\n\n"
+            yield sse_event({'type': 'personas_start'})
             from .council import generate_dynamic_personas
-            personas = await generate_dynamic_personas(request.content)
-            yield f"data: {json.dumps({'type': 'personas_complete', 'data': personas})}\n\n"
+            personas = await generate_dynamic_personas(request.content, context)
+            yield sse_event({'type': 'personas_complete', 'data': personas})
 
             # Stage 1: Collect responses
-            yield f"data: {json.dumps({'type': 'stage1_start'})}\n\n"
-            stage1_results = await stage1_collect_responses(request.content, personas)
-            yield f"data: {json.dumps({'type': 'stage1_complete', 'data': stage1_results})}\n\n"
+            yield sse_event({'type': 'stage1_start'})
+            # Stream tokens as personas write and each response as it completes;
+            # stage2 starts the moment the last one does
+            indexed_results = []
+            async for kind, index, data in stage1_stream_responses(request.content, personas):
+                if kind == "token":
+                    yield sse_event({'type': 'stage1_token', 'index': index, 'persona_id': personas[index]['id'], 'delta': data})
+                else:
+                    indexed_results.append((index, data))
+                    yield sse_event({'type': 'stage1_response', 'index': index, 'data': data})
+            indexed_results.sort(key=lambda item: item[0])
+            stage1_results = [result for _, result in indexed_results]
+            yield sse_event({'type': 'stage1_complete', 'data': stage1_results})
+
+            # Warm the chairman's prompt cache while Stage 2 ranks
+            blocks = format_stage1_blocks(stage1_results)
+            start_chairman_prefill(request.content, stage1_results, blocks)
 
             # Stage 2: Collect rankings
-            yield f"data: {json.dumps({'type': 'stage2_start'})}\n\n"
-            stage2_results, label_to_persona = await stage2_collect_rankings(request.content, stage1_results)
+            yield sse_event({'type': 'stage2_start'})
+            stage2_results, label_to_persona = await stage2_collect_rankings(request.content, stage1_results, blocks)
             aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_persona)
-            yield f"data: {json.dumps({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_persona, 'aggregate_rankings': aggregate_rankings}})}\n\n"
+            yield sse_event({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_persona, 'aggregate_rankings': aggregate_rankings}})
 
             # Stage 3: Synthesize final answer
-            yield f"data: {json.dumps({'type': 'stage3_start'})}\n\n"
-            stage3_result = await stage3_synthesize_final(request.content, stage1_results, stage2_results)
-            yield f"data: {json.dumps({'type': 'stage3_complete', 'data': stage3_result})}\n\n"
-
-            # Wait for title generation if it was started
-            if title_task:
-                title = await title_task
-                storage.update_conversation_title(conversation_id, title)
-                yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
-
-            # Save complete assistant message
-            storage.add_assistant_message(
-                conversation_id,
+            yield sse_event({'type': 'stage3_start'})
+            stage3_result = await stage3_synthesize_final(request.content, stage1_results, stage2_results, blocks)
+            yield sse_event({'type': 'stage3_complete', 'data': stage3_result})
+
+            # Add assistant message before waiting on the title, so the finished
+            # council is kept even if the client leaves during the wait
+            storage.append_assistant_message(
+                conversation,
                 personas,
                 stage1_results,
                 stage2_results,
                 stage3_result
             )
 
+            # Wait for title generation if it was started
+            if title_task:
+                title = await await_title(title_task)
+                yield sse_event({'type': 'title_complete', 'data': {'title': title}})
+
+            # Save user message, title and assistant message in one write
+            await persist_turn(conversation, turn_start, title_task)
+            saved = True
+
             # Send completion event
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+            yield sse_event({'type': 'complete'})
 
         except Exception as e:
+            # Keep the user's message even though the council failed
+            await persist_turn(conversation, turn_start, title_task)
+            saved = True
+
             # Send error event
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            yield sse_event({'type': 'error', 'message': str(e)})
+
+        finally:
+            # Client disconnects cancel the generator (CancelledError skips the
+            # except above); save whatever the turn got through
+            if not saved:
+                await persist_turn(conversation, turn_start, title_task)
 
     return StreamingResponse(
         event_generator(),
@@ -221,17 +340,16 @@ async def reply_to_message(conversation_id: str, request: ReplyRequest):
     """
     Reply directly to a specific persona/message.
     """
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await asyncio.to_thread(storage.get_conversation, conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # 1. Add User Message (The reply text)
-    storage.add_user_message(conversation_id, request.content)
+    # Appended in memory so the history below includes it without re-reading the file
+    turn_start = len(conversation["messages"])
+    storage.append_user_message(conversation, request.content)
 
     # 2. Generate reply
-    # We need to re-fetch conversation to get the user message we just added included in history
-    conversation = storage.get_conversation(conversation_id)
-    
     reply_data = await generate_direct_reply(
         request.persona,
         conversation["messages"],
@@ -240,13 +358,14 @@ async def reply_to_message(conversation_id: str, request: ReplyRequest):
 
     # 3. Store the reply as a new assistant message
     # We'll store it as a Stage 1 response type for consistency in UI rendering
-    storage.add_assistant_message(
-        conversation_id,
+    storage.append_assistant_message(
+        conversation,
         personas=[request.persona], # The persona involved
         stage1=[reply_data],        # The reply content formatted like a stage 1 response
         stage2=[],
         stage3=None                 # No synthesis for direct replies
     )
+    await persist_turn(conversation, turn_start)
     
     return reply_data
 
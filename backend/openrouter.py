@@ -1,14 +1,119 @@
 """OpenRouter API client for making LLM requests."""
 
+import asyncio
 import httpx
-from typing import List, Dict, Any, Optional
-from .config import OPENROUTER_API_KEY, OPENROUTER_API_URL
+import orjson
+from typing import List, Dict, Any, AsyncIterator, Optional, Union
+from .config import (
+    OPENROUTER_API_KEY,
+    OPENROUTER_API_URL,
+    OPENROUTER_EMBEDDINGS_URL,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_MAX_ATTEMPTS,
+)
+from .ratelimit import get_limiter, is_retryable, retry_delay
+
+# Messages either as a list of dicts or pre-serialized with encode_messages()
+Messages = Union[List[Dict[str, Any]], orjson.Fragment]
+
+# Process-wide client so every council stage reuses pooled HTTP/2 connections
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(120.0),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+    return _client
+
+
+# Running totals of provider-side prompt caching, for observability
+prompt_cache_usage = {
+    "prompt_tokens": 0,
+    "cached_tokens": 0,
+}
+
+
+def _record_prompt_cache_usage(usage: Optional[Dict[str, Any]]):
+    """Add a response's prompt/cached token counts to the running totals."""
+    if not usage:
+        return
+    details = usage.get('prompt_tokens_details') or {}
+    prompt_cache_usage["prompt_tokens"] += usage.get('prompt_tokens') or 0
+    prompt_cache_usage["cached_tokens"] += details.get('cached_tokens') or 0
+
+
+async def close_client():
+    """Close the shared HTTP client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def encode_messages(messages: List[Dict[str, Any]]) -> orjson.Fragment:
+    """
+    Serialize messages once so a prompt sent to many models (or hashed for
+    the cache) is embedded as ready-made JSON instead of re-encoded per request.
+    """
+    return orjson.Fragment(orjson.dumps(messages))
+
+
+async def _post_with_retry(
+    url: str,
+    model: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+    timeout: float
+) -> httpx.Response:
+    """
+    POST through the provider's rate limiter, retrying 429 and 5xx responses.
+
+    A 429 also pauses the whole provider for the backoff period so parallel
+    requests don't pile into the same limit.
+
+    Raises:
+        httpx.HTTPStatusError once retries are exhausted or for non-retryable errors
+    """
+    limiter = get_limiter(model)
+    body = orjson.dumps(payload)
+
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        async with limiter:
+            response = await get_client().post(
+                url,
+                headers=headers,
+                content=body,
+                timeout=timeout
+            )
+
+        if not is_retryable(response.status_code) or attempt == LLM_MAX_ATTEMPTS - 1:
+            break
+
+        delay = retry_delay(response, attempt)
+        if response.status_code == 429:
+            limiter.pause(delay)
+        await asyncio.sleep(delay)
+
+    response.raise_for_status()
+    return response
 
 
 async def query_model(
     model: str,
-    messages: List[Dict[str, str]],
-    timeout: float = 120.0
+    messages: Messages,
+    timeout: float = 120.0,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Query a single model via OpenRouter API.
@@ -16,10 +121,14 @@ async def query_model(
     Args:
         model: OpenRouter model identifier (e.g., "openai/gpt-4o")
         messages: List of message dicts with 'role' and 'content'
+            (content may be a list of text blocks, e.g. with 'cache_control'),
+            or the same pre-serialized with encode_messages()
         timeout: Request timeout in seconds
+        temperature: Sampling temperature (provider default if None)
+        max_tokens: Cap on generated tokens (provider default if None)
 
     Returns:
-        Response dict with 'content' and optional 'reasoning_details', or None if failed
+        Response dict with 'content', optional 'reasoning_details' and 'usage', or None if failed
     """
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
@@ -30,26 +139,138 @@ async def query_model(
         "model": model,
         "messages": messages,
     }
+    if temperature is not None:
+        payload["temperature"] = temperature
+    if max_tokens is not None:
+        payload["max_tokens"] = max_tokens
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
+        response = await _post_with_retry(OPENROUTER_API_URL, model, headers, payload, timeout)
+
+        data = response.json()
+        message = data['choices'][0]['message']
+
+        usage = data.get('usage')
+        _record_prompt_cache_usage(usage)
+
+        return {
+            'content': message.get('content'),
+            'reasoning_details': message.get('reasoning_details'),
+            'usage': usage
+        }
+
+    except Exception as e:
+        print(f"Error querying model {model}: {e}")
+        return None
+
+
+async def query_model_stream(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float = 120.0
+) -> AsyncIterator[str]:
+    """
+    Query a single model via OpenRouter API, streaming the response.
+
+    Args:
+        model: OpenRouter model identifier (e.g., "openai/gpt-4o")
+        messages: List of message dicts with 'role' and 'content'
+        timeout: Request timeout in seconds
+
+    Yields:
+        Content deltas as they arrive
+
+    Raises:
+        httpx.HTTPError or RuntimeError if the request fails mid-stream
+    """
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+    }
+
+    limiter = get_limiter(model)
+    body = orjson.dumps(payload)
+
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        async with limiter:
+            async with get_client().stream(
+                "POST",
                 OPENROUTER_API_URL,
                 headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
+                content=body,
+                timeout=timeout
+            ) as response:
+                # Retry only before any tokens have been yielded
+                retry = is_retryable(response.status_code) and attempt < LLM_MAX_ATTEMPTS - 1
+                if not retry:
+                    response.raise_for_status()
+
+                    async for line in response.aiter_lines():
+                        # Skip blank separators and SSE comments (": OPENROUTER PROCESSING")
+                        if not line.startswith("data: "):
+                            continue
+
+                        data = line[len("data: "):]
+                        if data == "[DONE]":
+                            break
+
+                        chunk = orjson.loads(data)
+                        if "error" in chunk:
+                            raise RuntimeError(chunk["error"].get("message", "stream error"))
 
-            data = response.json()
-            message = data['choices'][0]['message']
+                        choices = chunk.get("choices")
+                        if choices:
+                            delta = choices[0].get("delta", {}).get("content")
+                            if delta:
+                                yield delta
+                    return
 
-            return {
-                'content': message.get('content'),
-                'reasoning_details': message.get('reasoning_details')
-            }
+        delay = retry_delay(response, attempt)
+        if response.status_code == 429:
+            limiter.pause(delay)
+        await asyncio.sleep(delay)
+
+
+async def embed_text(
+    model: str,
+    text: str,
+    timeout: float = 30.0
+) -> Optional[List[float]]:
+    """
+    Compute an embedding for a piece of text via OpenRouter API.
+
+    Args:
+        model: OpenRouter embedding model identifier
+        text: Text to embed
+        timeout: Request timeout in seconds
+
+    Returns:
+        Embedding vector, or None if failed
+    """
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+    payload = {
+        "model": model,
+        "input": text,
+    }
+
+    try:
+        response = await _post_with_retry(OPENROUTER_EMBEDDINGS_URL, model, headers, payload, timeout)
+
+        data = response.json()
+        return data['data'][0]['embedding']
 
     except Exception as e:
-        print(f"Error querying model {model}: {e}")
+        print(f"Error embedding with model {model}: {e}")
         return None
 
 
@@ -67,10 +288,11 @@ async def query_models_parallel(
     Returns:
         Dict mapping model identifier to response dict (or None if failed)
     """
-    import asyncio
+    # Serialize the shared prompt once for every request
+    encoded = encode_messages(messages)
 
     # Create tasks for all models
-    tasks = [query_model(model, messages) for model in models]
+    tasks = [query_model(model, encoded) for model in models]
 
     # Wait for all to complete
     responses = await asyncio.gather(*tasks)
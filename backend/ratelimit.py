@@ -0,0 +1,105 @@
+"""Per-provider rate limiting and retry backoff for OpenRouter calls."""
+
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+import httpx
+from .config import (
+    PROVIDER_RATE_LIMITS,
+    DEFAULT_PROVIDER_RATE_LIMIT,
+    PROVIDER_MAX_CONCURRENCY,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+)
+
+
+class ProviderLimiter:
+    """
+    Token bucket (max_rate requests per second) plus a cap on in-flight requests.
+
+    Shared by every call to one upstream provider so stage1/stage2 fan-out
+    is smoothed out instead of tripping the provider's rate limit.
+    """
+
+    def __init__(self, max_rate: float, max_concurrency: int = PROVIDER_MAX_CONCURRENCY):
+        self.max_rate = max_rate
+        self._tokens = max_rate
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self):
+        """Wait for a free slot and a token."""
+        await self._in_flight.acquire()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+
+                    self._tokens = min(
+                        self.max_rate,
+                        self._tokens + (now - self._updated_at) * self.max_rate
+                    )
+                    self._updated_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+
+                    await asyncio.sleep((1 - self._tokens) / self.max_rate)
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+    def release(self):
+        """Free the in-flight slot taken by acquire()."""
+        self._in_flight.release()
+
+    def pause(self, seconds: float):
+        """Hold back every new request to this provider, e.g. after a 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(model: str) -> ProviderLimiter:
+    """Return the shared limiter for a model's provider (the "anthropic" in "anthropic/...")."""
+    provider = model.split("/", 1)[0]
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        limiter = ProviderLimiter(PROVIDER_RATE_LIMITS.get(provider, DEFAULT_PROVIDER_RATE_LIMIT))
+        _limiters[provider] = limiter
+    return limiter
+
+
+def is_retryable(status_code: int) -> bool:
+    """Rate limits and upstream server errors are worth retrying; other errors are not."""
+    return status_code == 429 or status_code >= 500
+
+
+def retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """
+    Seconds to wait before retrying: the server's Retry-After if given,
+    otherwise exponential backoff with jitter.
+    """
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, RETRY_BASE_DELAY))
@@ -0,0 +1,314 @@
+"""Embedding-based semantic cache for planning-stage LLM calls."""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from .openrouter import embed_text
+from .llm_cache import LLMCache
+from .config import (
+    EMBEDDING_MODEL,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_DIR,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+)
+
+
+# int8 quantization: unit vectors are scaled by 127, so dot products scale by 127²
+_QUANT_SCALE_SQ = 127 * 127
+
+# Rows scored per block during lookup
+_SCORE_BLOCK_ROWS = 4096
+
+
+def context_hash(context: Optional[List[str]] = None) -> str:
+    """
+    Hash the prior conversation turns a query depends on.
+
+    Two paraphrased queries only share a cached response when their
+    context chains match, so follow-ups like "what about the second one?"
+    never hit an entry created in a different conversation.
+    """
+    raw = json.dumps(context or [])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _replace_file(path: Path, data: bytes):
+    """Write a file atomically via a temp file and os.replace."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of (embedding, query, context_hash, response) entries.
+
+    Embeddings are L2-normalized and quantized to int8 (scaled by 127), so
+    cosine similarity is an integer inner product rescaled by 127². Vectors
+    are appended to a flat file under SEMANTIC_CACHE_DIR and memory-mapped
+    for lookups; entries are appended alongside as JSON lines. Only rows
+    with the query's context hash are scored, and once `max_entries` is
+    reached the oldest quarter is dropped.
+
+    lookup() and insert() do blocking file I/O; from async code use find()
+    and store(), which run them in a worker thread and treat any failure
+    as a miss. A lock serializes them across worker threads.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        self.namespace = namespace
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._rows_by_context: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self):
+        base = Path(SEMANTIC_CACHE_DIR)
+        return (
+            base / f"{self.namespace}.i8",
+            base / f"{self.namespace}.jsonl",
+            base / f"{self.namespace}.meta.json"
+        )
+
+    def _load(self):
+        """Map the persisted index on first use."""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        vectors_path, entries_path, meta_path = self._paths()
+        if not (vectors_path.exists() and entries_path.exists() and meta_path.exists()):
+            return
+
+        with open(meta_path, 'r') as f:
+            self._dim = json.load(f)["dim"]
+
+        with open(entries_path, 'r') as f:
+            for line in f:
+                try:
+                    self._entries.append(json.loads(line))
+                except ValueError:
+                    break  # Torn final line from an interrupted write
+
+        # Trim whichever file got ahead of the other if a write was interrupted
+        rows = min(len(self._entries), vectors_path.stat().st_size // self._dim)
+        if rows < len(self._entries) or vectors_path.stat().st_size != rows * self._dim:
+            self._entries = self._entries[:rows]
+            os.truncate(vectors_path, rows * self._dim)
+            _replace_file(entries_path, self._dump_entries())
+
+        self._index_contexts()
+        self._remap()
+
+    def _dump_entries(self) -> bytes:
+        return "".join(json.dumps(entry) + "\n" for entry in self._entries).encode()
+
+    def _index_contexts(self):
+        """Rebuild the context hash -> row numbers index."""
+        self._rows_by_context = {}
+        for row, entry in enumerate(self._entries):
+            self._rows_by_context.setdefault(entry["context_hash"], []).append(row)
+
+    def _remap(self):
+        """Memory-map the vectors file at its current size."""
+        vectors_path, _, _ = self._paths()
+        rows = len(self._entries)
+        self._vectors = (
+            np.memmap(vectors_path, dtype=np.int8, mode='r', shape=(rows, self._dim))
+            if rows else None
+        )
+
+    def _reset(self, dim: int):
+        """Start a fresh index, e.g. after the embedding model changed."""
+        vectors_path, entries_path, meta_path = self._paths()
+        vectors_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._vectors = None
+        self._entries = []
+        self._rows_by_context = {}
+        self._dim = dim
+        open(vectors_path, 'wb').close()
+        open(entries_path, 'w').close()
+        with open(meta_path, 'w') as f:
+            json.dump({"dim": dim}, f)
+
+    def _compact(self, keep: int):
+        """Drop all but the newest `keep` entries."""
+        vectors_path, entries_path, _ = self._paths()
+        start = len(self._entries) - keep
+
+        kept_vectors = self._vectors[start:].tobytes() if self._vectors is not None else b""
+        self._vectors = None
+        self._entries = self._entries[start:]
+
+        _replace_file(vectors_path, kept_vectors)
+        _replace_file(entries_path, self._dump_entries())
+        self._index_contexts()
+        self._remap()
+
+    @staticmethod
+    def _quantize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return np.round(vector * 127).astype(np.int8)
+
+    def _best_match(self, embedding: List[float], ctx_hash: str) -> Optional[Tuple[float, int]]:
+        """Highest cosine similarity among rows with this context, and its row number."""
+        rows = self._rows_by_context.get(ctx_hash)
+        if not rows or self._vectors is None or self._dim != len(embedding):
+            return None
+
+        query = self._quantize(embedding).astype(np.int32)
+
+        # Score in blocks so only a slice of the map is widened at a time
+        best_score, best = float("-inf"), rows[0]
+        for start in range(0, len(rows), _SCORE_BLOCK_ROWS):
+            block = rows[start:start + _SCORE_BLOCK_ROWS]
+            scores = self._vectors[block].astype(np.int32) @ query
+            i = int(np.argmax(scores))
+            if scores[i] > best_score:
+                best_score, best = int(scores[i]), block[i]
+
+        return best_score / _QUANT_SCALE_SQ, best
+
+    def lookup(self, embedding: List[float], ctx_hash: str) -> Optional[Any]:
+        """
+        Return the cached response for the most similar query in the same context, if close enough.
+
+        Args:
+            embedding: Embedding of the incoming query
+            ctx_hash: Hash of the query's conversation context
+
+        Returns:
+            Cached response, or None on miss
+        """
+        with self._lock:
+            self._load()
+
+            match = self._best_match(embedding, ctx_hash)
+            if match is not None and match[0] > self.threshold:
+                self.hits += 1
+                return self._entries[match[1]]["response"]
+
+            self.misses += 1
+            return None
+
+    def insert(self, embedding: List[float], query: str, ctx_hash: str, response: Any):
+        """Append a new entry to the persisted index, unless this context already has a match."""
+        with self._lock:
+            self._load()
+            if self._dim != len(embedding):
+                self._reset(len(embedding))
+
+            # A concurrent miss on the same query may have stored it already
+            match = self._best_match(embedding, ctx_hash)
+            if match is not None and match[0] > self.threshold:
+                return
+
+            if len(self._entries) >= self.max_entries:
+                self._compact(self.max_entries * 3 // 4)
+
+            entry = {
+                "query": query,
+                "context_hash": ctx_hash,
+                "response": response
+            }
+
+            vectors_path, entries_path, _ = self._paths()
+            with open(vectors_path, 'ab') as f:
+                f.write(self._quantize(embedding).tobytes())
+            with open(entries_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+
+            self._entries.append(entry)
+            self._rows_by_context.setdefault(ctx_hash, []).append(len(self._entries) - 1)
+            self._remap()
+
+    async def find(self, embedding: List[float], ctx_hash: str) -> Optional[Any]:
+        """lookup() off the event loop; errors (e.g. disk I/O) are logged and count as a miss."""
+        try:
+            return await asyncio.to_thread(self.lookup, embedding, ctx_hash)
+        except Exception as e:
+            print(f"Error reading semantic cache '{self.namespace}': {e}")
+            return None
+
+    async def store(self, embedding: List[float], query: str, ctx_hash: str, response: Any):
+        """insert() off the event loop; errors are logged and the response just isn't cached."""
+        try:
+            await asyncio.to_thread(self.insert, embedding, query, ctx_hash, response)
+        except Exception as e:
+            print(f"Error writing semantic cache '{self.namespace}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for observability."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries)
+        }
+
+
+# Semantic caches for the two planning-stage calls
+persona_cache = SemanticCache("personas")
+title_cache = SemanticCache("titles")
+
+# Personas and title embed the same first message; embed it once
+_embedding_cache = LLMCache(max_entries=256)
+
+# Embeddings currently awaiting the provider, keyed like _embedding_cache
+_inflight: Dict[str, "asyncio.Task[Optional[List[float]]]"] = {}
+
+
+async def _embed_and_store(key: str, text: str) -> Optional[List[float]]:
+    embedding = await embed_text(EMBEDDING_MODEL, text)
+    if embedding is not None:
+        await _embedding_cache.set(key, {"embedding": embedding})
+    return embedding
+
+
+async def embed_query(text: str) -> Optional[List[float]]:
+    """
+    Embed a user query, reusing recent embeddings of identical text.
+
+    Personas and title look up the same first message concurrently, so a
+    request already in flight for the text is shared rather than repeated.
+
+    Args:
+        text: The user query
+
+    Returns:
+        Embedding vector, or None if the embeddings call failed
+    """
+    key = LLMCache.make_key(EMBEDDING_MODEL, [{"role": "user", "content": text}], 0.0)
+
+    cached = await _embedding_cache.get(key)
+    if cached is not None:
+        return cached["embedding"]
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_embed_and_store(key, text))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    # Shield so one caller being cancelled doesn't cancel the request for the other
+    return await asyncio.shield(task)
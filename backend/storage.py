@@ -1,13 +1,26 @@
 """JSON-based storage for conversations."""
 
-import json
 import os
+import tempfile
+import threading
+import orjson
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 from .config import DATA_DIR
 
 
+def _default_file_mode() -> int:
+    """Mode a plain open() would give a new file under the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Read once at import: os.umask can only be read by setting it, which isn't thread-safe
+_FILE_MODE = _default_file_mode()
+
+
 def ensure_data_dir():
     """Ensure the data directory exists."""
     Path(DATA_DIR).mkdir(parents=True, exist_ok=True)
@@ -18,6 +31,27 @@ def get_conversation_path(conversation_id: str) -> str:
     return os.path.join(DATA_DIR, f"{conversation_id}.json")
 
 
+def write_json(path: str, data: Dict[str, Any]):
+    """
+    Write JSON atomically: readers see either the old file or the new one,
+    never a half-written conversation.
+
+    Each write gets its own temp file (saves run in worker threads, so two
+    saves of one conversation can overlap).
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mkstemp creates files owner-only (0600); keep the umask default conversations always had
+            os.fchmod(f.fileno(), _FILE_MODE)
+            # default=dict: built-in personas are read-only MappingProxyType views
+            f.write(orjson.dumps(data, default=dict, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
 def create_conversation(conversation_id: str) -> Dict[str, Any]:
     """
     Create a new conversation.
@@ -38,9 +72,7 @@ def create_conversation(conversation_id: str) -> Dict[str, Any]:
     }
 
     # Save to file
-    path = get_conversation_path(conversation_id)
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
+    write_json(get_conversation_path(conversation_id), conversation)
 
     return conversation
 
@@ -60,8 +92,8 @@ def get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
     if not os.path.exists(path):
         return None
 
-    with open(path, 'r') as f:
-        return json.load(f)
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
 
 
 def save_conversation(conversation: Dict[str, Any]):
@@ -73,9 +105,45 @@ def save_conversation(conversation: Dict[str, Any]):
     """
     ensure_data_dir()
 
-    path = get_conversation_path(conversation['id'])
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
+    write_json(get_conversation_path(conversation['id']), conversation)
+
+
+# Per-conversation locks serializing save_turn's read-modify-write across worker threads
+_save_locks: Dict[str, threading.Lock] = {}
+_save_locks_guard = threading.Lock()
+
+
+def _save_lock(conversation_id: str) -> threading.Lock:
+    with _save_locks_guard:
+        return _save_locks.setdefault(conversation_id, threading.Lock())
+
+
+def save_turn(
+    conversation_id: str,
+    messages: List[Dict[str, Any]],
+    title: Optional[str] = None
+):
+    """
+    Append one turn's messages (and optionally a title) to a stored conversation.
+
+    The file is re-read under a per-conversation lock right before the
+    write, so turns saved concurrently (e.g. a direct reply while a council
+    is still streaming) are all kept rather than the last snapshot winning.
+
+    Args:
+        conversation_id: Conversation identifier
+        messages: New messages from this turn, in order
+        title: New title, or None to leave it unchanged
+    """
+    with _save_lock(conversation_id):
+        conversation = get_conversation(conversation_id)
+        if conversation is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+
+        conversation["messages"].extend(messages)
+        if title is not None:
+            conversation["title"] = title
+        save_conversation(conversation)
 
 
 def list_conversations() -> List[Dict[str, Any]]:
@@ -91,8 +159,8 @@ def list_conversations() -> List[Dict[str, Any]]:
     for filename in os.listdir(DATA_DIR):
         if filename.endswith('.json'):
             path = os.path.join(DATA_DIR, filename)
-            with open(path, 'r') as f:
-                data = json.load(f)
+            with open(path, 'rb') as f:
+                data = orjson.loads(f.read())
                 # Return metadata only
                 conversations.append({
                     "id": data["id"],
@@ -107,47 +175,37 @@ def list_conversations() -> List[Dict[str, Any]]:
     return conversations
 
 
-def add_user_message(conversation_id: str, content: str):
+def append_user_message(conversation: Dict[str, Any], content: str):
     """
-    Add a user message to a conversation.
+    Append a user message to an in-memory conversation (not saved).
 
     Args:
-        conversation_id: Conversation identifier
+        conversation: Conversation dict
         content: User message content
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
     conversation["messages"].append({
         "role": "user",
         "content": content
     })
 
-    save_conversation(conversation)
-
 
-def add_assistant_message(
-    conversation_id: str,
+def append_assistant_message(
+    conversation: Dict[str, Any],
     personas: List[Dict[str, Any]],
     stage1: List[Dict[str, Any]],
     stage2: List[Dict[str, Any]],
     stage3: Dict[str, Any]
 ):
     """
-    Add an assistant message with all 3 stages to a conversation.
+    Append an assistant message with all 3 stages to an in-memory conversation (not saved).
 
     Args:
-        conversation_id: Conversation identifier
+        conversation: Conversation dict
         personas: List of generated personas for this response
         stage1: List of individual model responses
         stage2: List of model rankings
         stage3: Final synthesized response
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
     conversation["messages"].append({
         "role": "assistant",
         "personas": personas,
@@ -155,21 +213,3 @@ def add_assistant_message(
         "stage2": stage2,
         "stage3": stage3
     })
-
-    save_conversation(conversation)
-
-
-def update_conversation_title(conversation_id: str, title: str):
-    """
-    Update the title of a conversation.
-
-    Args:
-        conversation_id: Conversation identifier
-        title: New title for the conversation
-    """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
-    conversation["title"] = title
-    save_conversation(conversation)
@@ -105,6 +105,59 @@ function App() {
               });
               break;
 
+            case 'personas_complete':
+              setCurrentConversation((prev) => {
+                const messages = [...prev.messages];
+                const lastMsg = messages[messages.length - 1];
+                lastMsg.personas = event.data;
+                return { ...prev, messages };
+              });
+              break;
+
+            case 'stage1_token':
+              // Copy the message so the append stays correct if React re-runs the updater
+              setCurrentConversation((prev) => {
+                const messages = [...prev.messages];
+                const lastMsg = { ...messages[messages.length - 1] };
+                const stage1 = [...(lastMsg.stage1 || [])];
+                const pos = stage1.findIndex((resp) => resp.index === event.index);
+                if (pos === -1) {
+                  const persona = lastMsg.personas?.[event.index] || {};
+                  stage1.push({
+                    index: event.index,
+                    persona_id: event.persona_id,
+                    persona_name: persona.name,
+                    persona_icon: persona.icon,
+                    model: persona.model || '',
+                    response: event.delta,
+                  });
+                } else {
+                  stage1[pos] = { ...stage1[pos], response: stage1[pos].response + event.delta };
+                }
+                lastMsg.stage1 = stage1;
+                messages[messages.length - 1] = lastMsg;
+                return { ...prev, messages };
+              });
+              break;
+
+            case 'stage1_response':
+              setCurrentConversation((prev) => {
+                const messages = [...prev.messages];
+                const lastMsg = { ...messages[messages.length - 1] };
+                const stage1 = [...(lastMsg.stage1 || [])];
+                const pos = stage1.findIndex((resp) => resp.index === event.index);
+                const resp = { ...event.data, index: event.index };
+                if (pos === -1) {
+                  stage1.push(resp);
+                } else {
+                  stage1[pos] = resp;
+                }
+                lastMsg.stage1 = stage1;
+                messages[messages.length - 1] = lastMsg;
+                return { ...prev, messages };
+              });
+              break;
+
             case 'stage1_complete':
               setCurrentConversation((prev) => {
                 const messages = [...prev.messages];